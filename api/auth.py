@@ -1,16 +1,20 @@
 """
 Authentication module for AdbSms API
 """
+import hmac
 import os
 import uuid
 import functools
 from flask import request, jsonify, current_app
 from datetime import datetime, timedelta
-from api.app import db, logger
+from api.extensions import db, logger
 
 # Set default API key or generate a secure one if not set
 API_KEY = os.getenv("ADBSMS_API_KEY", "dev-key-change-me-in-production")
 
+# Precomputed bytes form of the key for constant-time comparison on the hot path
+_API_KEY_BYTES = API_KEY.encode('utf-8')
+
 
 class ApiKey:
     """Simple API key model for authentication"""
@@ -28,17 +32,21 @@ def require_api_key(f):
         if current_app.config.get('SKIP_AUTH_IN_DEV') and current_app.debug:
             return f(*args, **kwargs)
             
-        # Check for API key in header or query parameter
-        api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
-        
+        # Check for API key in header, falling back to the query parameter
+        # only when the header is absent
+        api_key = request.headers.get('X-API-Key')
+        if not api_key:
+            api_key = request.args.get('api_key')
+
         if not api_key:
             logger.warning(f"API request without key: {request.path}")
             return jsonify({
-                "error": "Unauthorized", 
+                "error": "Unauthorized",
                 "message": "Missing API key"
             }), 401
-            
-        if api_key != API_KEY:
+
+        # Constant-time comparison so the check does not leak timing info
+        if not hmac.compare_digest(api_key.encode('utf-8'), _API_KEY_BYTES):
             logger.warning(f"Invalid API key used: {api_key[:6]}...")
             return jsonify({
                 "error": "Forbidden", 
@@ -0,0 +1,93 @@
+"""
+Redis response cache for AdbSms API
+
+Short-TTL caching for dashboard endpoints that get polled far more
+often than their underlying data changes. Cache failures are treated
+as misses so the API keeps working when Redis is unavailable.
+"""
+import functools
+import os
+import redis
+from flask import request, Response
+
+from api.extensions import logger
+
+# Dedicated Redis connection pool for response caching (db 3; the
+# Celery broker/backend use 0/1 and the rate limiter uses 2)
+redis_client = redis.Redis.from_url(
+    os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/3'),
+    socket_connect_timeout=0.5,
+    socket_timeout=0.5,
+)
+
+
+def cached(key, ttl=5, vary=()):
+    """
+    Decorator that caches a view's JSON response body in Redis.
+
+    Args:
+        key: Base cache key for this view
+        ttl: Seconds to keep the cached body
+        vary: Query parameters that produce distinct cache entries
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            cache_key = key
+            for param in vary:
+                cache_key += f":{request.args.get(param, 'all')}"
+
+            try:
+                hit = redis_client.get(cache_key)
+            except redis.RedisError:
+                hit = None
+
+            if hit is not None:
+                return Response(hit, mimetype='application/json')
+
+            response = f(*args, **kwargs)
+
+            # Only cache plain successful JSON responses
+            if isinstance(response, Response) and response.status_code == 200:
+                try:
+                    redis_client.setex(cache_key, ttl, response.get_data())
+                except redis.RedisError as e:
+                    logger.debug(f"Cache write failed for {cache_key}: {e}")
+
+            return response
+        return wrapper
+    return decorator
+
+
+def single_flight_task(key, ttl, enqueue):
+    """
+    Enqueue at most one task per ttl window (SET NX). The winner's task
+    id is stored under the key so followers get the in-flight id back
+    instead of queuing a duplicate. Fails open when Redis is down - a
+    duplicate task beats a missing one.
+
+    Args:
+        key: Lock key shared by callers that would duplicate the work
+        ttl: Seconds before a new task may be enqueued
+        enqueue: Zero-argument callable that queues the task and
+            returns its id
+    """
+    try:
+        if redis_client.set(key, "", nx=True, ex=ttl):
+            task_id = enqueue()
+            redis_client.set(key, task_id, ex=ttl)
+            return task_id
+        existing = redis_client.get(key)
+        return existing.decode() if existing else None
+    except redis.RedisError:
+        return enqueue()
+
+
+def invalidate(key):
+    """Delete all cached entries for a base key (including vary variants)"""
+    try:
+        keys = list(redis_client.scan_iter(match=f"{key}*"))
+        if keys:
+            redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.debug(f"Cache invalidation failed for {key}: {e}")
@@ -5,17 +5,39 @@ import os
 from celery import Celery
 from kombu import Exchange, Queue
 
+# celery's -P gevent startup monkey-patches the stdlib before this
+# module is imported, but psycopg2 is a C extension gevent cannot
+# patch: without psycogreen every db.session.commit() in the gevent
+# worker would block the hub and serialize all greenlets around each
+# DB write. Keying off the patched socket module applies it exactly
+# when a gevent pool is in play (in the API process wsgi.py has
+# already done both; patch_psycopg is idempotent)
+try:
+    from gevent import monkey as _gevent_monkey
+except ImportError:  # no gevent installed means no gevent pool to green
+    _gevent_monkey = None
+
+if _gevent_monkey is not None and _gevent_monkey.is_module_patched('socket'):
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
 # Define default queue
 default_exchange = Exchange('default', type='direct')
-priority_exchange = Exchange('priority', type='direct')
+# Transient exchange (delivery_mode=1): messages are never persisted to
+# disk. Device checks and maintenance re-fire on schedule, so losing
+# one on a broker restart is harmless
+transient_exchange = Exchange('transient', type='direct', delivery_mode=1)
 
 # Define queues with their priorities
 task_queues = (
     Queue('default', default_exchange, routing_key='default'),
-    Queue('priority', priority_exchange, routing_key='priority'),
+    # Single sends are transient too: the Message row is committed
+    # before the task is queued, so a send lost to a broker restart
+    # stays visibly 'pending' instead of silently vanishing
+    Queue('sms', transient_exchange, routing_key='sms', durable=False),
+    Queue('priority', transient_exchange, routing_key='priority', durable=False),
     Queue('bulk', default_exchange, routing_key='bulk'),
-    Queue('monitor', default_exchange, routing_key='monitor'),
-    Queue('maintenance', default_exchange, routing_key='maintenance'),
+    Queue('maintenance', transient_exchange, routing_key='maintenance', durable=False),
 )
 
 # Initialize Celery
@@ -28,35 +50,57 @@ celery = Celery(
 
 # Configuration
 celery.conf.update(
-    # Result backend settings
+    # Result backend settings. Nothing reads task return values (job
+    # progress lives in the database), so skip the backend write per
+    # task - it was pure write amplification on the sms queue
     result_expires=3600,  # results expire after 1 hour
-    
-    # Task execution settings
+    task_ignore_result=True,
+
+    # Task execution settings. Prefetch/concurrency are set per worker
+    # pool on the command line (see docker-compose.yml): a "short" pool
+    # for quick tasks and a "bulk" pool for long-running jobs, so bulk
+    # sends cannot starve device checks. All tasks ack late: sends are
+    # keyed by message_id and set status, so a redelivered task is
+    # harmless, and a worker crash no longer loses the in-flight one
     worker_prefetch_multiplier=1,  # Fetch only one task at a time
-    task_acks_late=True,  # Acknowledge task after execution, not before
+    task_acks_late=True,
     task_time_limit=300,  # Kill task if it runs longer than 5 minutes
     task_soft_time_limit=240,  # Raise exception if task runs longer than 4 minutes
+
+    # Broker connection hygiene: cap the publisher connection pool and
+    # disable AMQP-style heartbeats, which are no-ops on Redis but still
+    # schedule timers
+    broker_pool_limit=10,
+    broker_heartbeat=0,
     
+    # Priority emulation on the Redis broker: tasks carry a priority
+    # (0 = served first) so a dashboard-initiated send jumps ahead of
+    # messages expanded from a bulk job on the same queue
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+
     # Queue settings
     task_default_queue='default',
     task_default_exchange='default',
     task_default_routing_key='default',
     task_queues=task_queues,
     
-    # Concurrency settings - adjusted for ADB operations
-    worker_concurrency=4,  # Limit concurrent tasks
-    
     # Task routes for different task types
     task_routes={
         # Device check tasks (higher priority)
         'api.tasks.check_adb_connection_task': {
             'queue': 'priority',
             'routing_key': 'priority',
+            'delivery_mode': 'transient',
         },
         # Single SMS tasks
         'api.tasks.send_sms_task': {
-            'queue': 'default',
-            'routing_key': 'default',
+            'queue': 'sms',
+            'routing_key': 'sms',
+            'delivery_mode': 'transient',
         },
         # Bulk tasks (lower priority)
         'api.tasks.process_bulk_sms_job': {
@@ -67,15 +111,11 @@ celery.conf.update(
             'queue': 'bulk',
             'routing_key': 'bulk',
         },
-        # Job monitoring tasks
-        'api.tasks.monitor_bulk_job': {
-            'queue': 'monitor',
-            'routing_key': 'monitor',
-        },
         # Maintenance tasks
         'api.tasks.clean_temp_files': {
             'queue': 'maintenance',
             'routing_key': 'maintenance',
+            'delivery_mode': 'transient',
         },
     },
 )
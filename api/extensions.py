@@ -0,0 +1,40 @@
+"""
+Shared Flask extensions for AdbSms
+
+The extensions live here, unbound from the app, so that api.routes,
+api.tasks and api.auth can import them at module level without going
+through api.app (which would be a circular import). api.app binds them
+with init_app() once the app is configured.
+"""
+from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+import logging
+import os
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('api.app')
+
+# Database and migrations
+db = SQLAlchemy()
+migrate = Migrate()
+
+# Rate limiting - Redis-backed so limits are shared across workers,
+# with a moving window so counters roll instead of resetting at
+# boundaries. A Redis outage must degrade limiting, not availability
+# (the same stance api.cache takes on cache errors): fall back to
+# per-process in-memory counters and swallow any remaining storage
+# errors instead of 500ing every limited endpoint
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["200 per day", "50 per hour"],
+    storage_uri=os.getenv('RATELIMIT_STORAGE_URI', 'redis://localhost:6379/2'),
+    strategy="moving-window",
+    in_memory_fallback_enabled=True,
+    swallow_errors=True,
+)
@@ -2,19 +2,35 @@
 Database models for AdbSms API
 """
 from datetime import datetime
-from api.app import db
+from api.extensions import db
 
 
 class Message(db.Model):
     """Model for SMS messages"""
     __tablename__ = 'messages'
-    
+    __table_args__ = (
+        # Composite index matching the history filter (status + date
+        # range, ordered by created_at)
+        db.Index('ix_msg_created_status', 'created_at', 'status'),
+        # Trigram index so phone_number LIKE '%...%' searches can use
+        # an index scan (requires the pg_trgm extension)
+        db.Index('ix_msg_phone_trgm', 'phone_number',
+                 postgresql_using='gin',
+                 postgresql_ops={'phone_number': 'gin_trgm_ops'}),
+        # Covers the bulk-job progress aggregation (sim_id equality +
+        # created_at range, grouped by status) as an index-only scan
+        db.Index('ix_msg_sim_created_status', 'sim_id', 'created_at',
+                 'status'),
+    )
+
+
     id = db.Column(db.Integer, primary_key=True)
     phone_number = db.Column(db.String(20), nullable=False)
     content = db.Column(db.Text, nullable=False)
     sim_id = db.Column(db.Integer, default=3)
-    status = db.Column(db.String(20), default='pending')  # pending, sent, failed
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), default='pending',
+                       server_default=db.text("'pending'"), index=True)  # pending, sent, failed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     sent_at = db.Column(db.DateTime, nullable=True)
     
     def __repr__(self):
@@ -27,8 +43,9 @@ class Message(db.Model):
             'content': self.content,
             'sim_id': self.sim_id,
             'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+            # Raw datetimes - orjson serializes them natively in C
+            'created_at': self.created_at,
+            'sent_at': self.sent_at
         }
 
 
@@ -40,11 +57,11 @@ class BulkMessageJob(db.Model):
     filename = db.Column(db.String(255), nullable=True)
     sim_id = db.Column(db.Integer, default=3)
     delay = db.Column(db.Float, default=1.0)
-    status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, processing, completed, failed
     total_messages = db.Column(db.Integer, default=0)
     successful_messages = db.Column(db.Integer, default=0)
     failed_messages = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     completed_at = db.Column(db.DateTime, nullable=True)
     task_id = db.Column(db.String(36), nullable=True)  # Celery task ID
     
@@ -61,8 +78,8 @@ class BulkMessageJob(db.Model):
             'total_messages': self.total_messages,
             'successful_messages': self.successful_messages,
             'failed_messages': self.failed_messages,
-            'created_at': self.created_at.isoformat(),
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'created_at': self.created_at,
+            'completed_at': self.completed_at,
             'task_id': self.task_id
         }
 
@@ -75,7 +92,7 @@ class DeviceStatus(db.Model):
     device_id = db.Column(db.String(100), nullable=True)
     connected = db.Column(db.Boolean, default=False)
     state = db.Column(db.String(20), nullable=True)  # device, unauthorized, offline
-    last_check = db.Column(db.DateTime, default=datetime.utcnow)
+    last_check = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
         return f"<DeviceStatus {self.device_id}: {self.state}>"
@@ -86,5 +103,5 @@ class DeviceStatus(db.Model):
             'device_id': self.device_id,
             'connected': self.connected,
             'state': self.state,
-            'last_check': self.last_check.isoformat()
+            'last_check': self.last_check
         }
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Local token buckets that front the Redis-backed rate limiter
+
+Every rate-limited request otherwise pays a Redis round trip for
+accounting. Each nominal limit is partitioned: the workers' in-process
+buckets collectively hold (at most) half of it, and only the remainder
+is registered with Flask-Limiter's Redis counters. Requests that fit in
+local credit skip the Redis round trip entirely; the overflow falls
+through to the distributed check. Because requests admitted locally are
+exempted from (and thus never counted by) the Redis limiter, the two
+admission paths are additive - sizing them as a partition keeps the
+sustained combined rate at or below the nominal limit. A cold-start
+burst can exceed it once, by the pre-filled local capacity.
+"""
+import os
+import re
+import threading
+import time
+
+from api.extensions import limiter
+
+
+class TokenBucket:
+    """Thread-safe token bucket over a monotonic clock"""
+    __slots__ = ('capacity', 'rate', 'tokens', 'ts', 'lock')
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)  # tokens per second
+        self.tokens = float(capacity)
+        self.ts = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.ts) * self.rate
+            )
+            self.ts = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+# How many worker processes share each limit; used to size local buckets
+_WORKERS = int(os.getenv('RATELIMIT_LOCAL_WORKERS', '4'))
+
+_PER_MINUTE = re.compile(r'(\d+)\s*(?:per\s+|/)\s*minute')
+
+
+def shared_limit(limit_string):
+    """
+    Drop-in replacement for @limiter.limit that serves part of the
+    nominal per-minute limit from an in-process token bucket. Each
+    worker's bucket gets its share of half the limit; the other half
+    (plus any rounding remainder) stays with the Redis counters, so
+    local + distributed admits never exceed the declared rate.
+    """
+    match = _PER_MINUTE.search(limit_string)
+    if not match:
+        raise ValueError(f"Unsupported limit string: {limit_string!r}")
+
+    count = int(match.group(1))
+    share = (count // 2) // _WORKERS
+    if share < 1:
+        # Too small to partition - fully distributed accounting
+        return limiter.limit(limit_string)
+
+    bucket = TokenBucket(capacity=share, rate=share / 60.0)
+    return limiter.limit(f"{count - share * _WORKERS}/minute",
+                         exempt_when=bucket.try_acquire)
@@ -2,33 +2,77 @@
 API routes for AdbSms - High-performance implementation
 """
 import os
+import re
 import tempfile
 import time
 import io
 import base64
+import binascii
 from datetime import datetime, timedelta
 from flask import request, jsonify, Blueprint, current_app, url_for
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 from functools import wraps
-import traceback
+import math
+import redis
+from sqlalchemy import func, select, text, tuple_
 
+from api.cache import cached, invalidate, redis_client, single_flight_task
+from api.extensions import db, logger
 from api.models import Message, BulkMessageJob, DeviceStatus
+from api.ratelimit import shared_limit
 from api.auth import require_api_key
+# Import the module (not the task names) so this also works when the
+# Celery worker imports api.tasks first and it is still initializing
+from api import tasks
 
 # Initialize Blueprint for API v1
 api_v1 = Blueprint('api_v1', __name__)
 
+# Where bulk CSV uploads are spooled. Must be a path shared with the
+# Celery bulk worker (e.g. a bind mount) so the worker can read it
+UPLOAD_DIR = os.getenv('UPLOAD_DIR', tempfile.gettempdir())
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# E.164 phone number format, compiled once at module load
+PHONE_RE = re.compile(r'\+[1-9]\d{5,14}$')
+
+# Sanitized CSV filenames only - rejects hostile names before any disk work
+CSV_NAME_RE = re.compile(r'[\w.\-]+\.csv$')
+
+# Column tuples for list endpoints: selecting columns instead of
+# entities skips ORM instance hydration, and the Row mappings already
+# match the to_dict() shape
+MESSAGE_COLS = (Message.id, Message.phone_number, Message.content,
+                Message.sim_id, Message.status, Message.created_at,
+                Message.sent_at)
+DEVICE_COLS = (DeviceStatus.id, DeviceStatus.device_id,
+               DeviceStatus.connected, DeviceStatus.state,
+               DeviceStatus.last_check)
+BULK_JOB_COLS = (BulkMessageJob.id, BulkMessageJob.filename,
+                 BulkMessageJob.sim_id, BulkMessageJob.delay,
+                 BulkMessageJob.status, BulkMessageJob.total_messages,
+                 BulkMessageJob.successful_messages,
+                 BulkMessageJob.failed_messages,
+                 BulkMessageJob.created_at, BulkMessageJob.completed_at,
+                 BulkMessageJob.task_id)
+
 # Helper decorator for handling exceptions consistently
 def handle_exceptions(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
+        except HTTPException:
+            # Raised beneath this decorator by e.g. the rate limiter
+            # (flask-limiter checks decorated limits inside the view
+            # wrapper) - let Flask's error handlers answer with the
+            # right status instead of masking it as a 500
+            raise
         except Exception as e:
-            # Import logger to avoid circular import
-            from api.app import logger
-            logger.error(f"Error in {f.__name__}: {str(e)}")
-            logger.error(traceback.format_exc())
+            # logger.exception defers traceback formatting until the
+            # handler actually emits, instead of walking the stack here
+            logger.exception(f"Error in {f.__name__}: {e}")
             return jsonify({
                 "error": "Internal server error", 
                 "message": str(e)
@@ -38,57 +82,61 @@ def handle_exceptions(f):
 # Device status endpoints
 @api_v1.route('/device/status', methods=['GET'])
 @handle_exceptions
+@shared_limit("30/minute")
 @require_api_key
+@cached(key="device_status:v1", ttl=10)
 def device_status():
     """Get current device connection status"""
-    # Import here to avoid circular import
-    from api.app import limiter, db, logger
-    from api.tasks import check_adb_connection_task
-    
-    # Apply rate limiter
-    limiter.limit("30/minute")(lambda: None)()
-    
-    status = DeviceStatus.query.order_by(DeviceStatus.last_check.desc()).first()
+    # Column select: one round trip, no ORM instance construction on
+    # this hot, constantly-polled endpoint
+    status = db.session.execute(
+        select(*DEVICE_COLS).order_by(DeviceStatus.last_check.desc()).limit(1)
+    ).first()
     
     if not status:
-        # If no status exists, trigger a check and create one
-        task = check_adb_connection_task.delay()
+        # If no status exists, trigger a check and create one.
+        # Single-flight so concurrent callers enqueue only one task;
+        # followers get the in-flight task id
+        task_id = single_flight_task(
+            "adb:check:inflight", 60,
+            lambda: tasks.check_adb_connection_task.delay().id)
         return jsonify({
             "status": "checking",
             "message": "Checking device status...",
-            "task_id": task.id
+            "task_id": task_id
         })
-    
+
     # If status is outdated (older than 5 minutes), trigger a new check
     if (datetime.utcnow() - status.last_check).total_seconds() > 300:
-        task = check_adb_connection_task.delay()
+        task_id = single_flight_task(
+            "adb:check:inflight", 60,
+            lambda: tasks.check_adb_connection_task.delay().id)
         return jsonify({
             "status": "refreshing",
             "message": "Status is outdated, refreshing...",
-            "last_status": status.to_dict(),
-            "task_id": task.id
+            "last_status": dict(status._mapping),
+            "task_id": task_id
         })
-    
-    return jsonify(status.to_dict())
+
+    return jsonify(dict(status._mapping))
 
 
 @api_v1.route('/device/check', methods=['POST'])
 @handle_exceptions
+@shared_limit("10/minute")
 @require_api_key
 def check_device():
     """Force a check of the device connection"""
-    # Import here to avoid circular import
-    from api.app import limiter, logger
-    from api.tasks import check_adb_connection_task
-    
-    # Apply rate limiter
-    limiter.limit("10/minute")(lambda: None)()
-    
-    task = check_adb_connection_task.delay()
-    logger.info(f"Device check initiated: {task.id}")
+    invalidate("device_status:v1")
+    # Rapid-fire presses collapse into one probe; followers get the
+    # task id of the check already in flight
+    task_id = single_flight_task(
+        "adb:check:inflight", 10,
+        lambda: tasks.check_adb_connection_task.delay().id)
+    logger.info(f"Device check initiated: {task_id}")
     return jsonify({
         "status": "accepted",
-        "task_id": task.id,
+        "task_id": task_id,
         "message": "Device check initiated"
     })
 
@@ -96,16 +144,10 @@ def check_device():
 # SMS endpoints
 @api_v1.route('/sms', methods=['POST'])
 @handle_exceptions
+@shared_limit("30/minute")
 @require_api_key
 def send_sms():
     """Send a single SMS message"""
-    # Import here to avoid circular import
-    from api.app import db, limiter, logger
-    from api.tasks import send_sms_task
-    
-    # Apply rate limiter
-    limiter.limit("30/minute")(lambda: None)()
-    
     data = request.get_json()
     if not data:
         return jsonify({"error": "No JSON data provided"}), 400
@@ -116,10 +158,10 @@ def send_sms():
         if field not in data:
             return jsonify({"error": f"Missing required field: {field}"}), 400
     
-    # Validate phone number format (basic validation)
+    # Validate phone number format (E.164)
     phone = data['phone_number']
-    if not (phone.startswith('+') and len(phone) >= 7):
-        return jsonify({"error": "Phone number must start with + and be at least 7 characters"}), 400
+    if not PHONE_RE.match(phone):
+        return jsonify({"error": "Phone number must be in E.164 format, e.g. +254712345678"}), 400
     
     # Validate content length
     content = data['content']
@@ -137,9 +179,11 @@ def send_sms():
     db.session.add(message)
     db.session.commit()
     
-    # Queue the task
-    task = send_sms_task.delay(message.id)
+    # Queue the task at top priority so user-initiated sends jump ahead
+    # of any backlog expanded from bulk jobs
+    task = tasks.send_sms_task.apply_async((message.id,), priority=0)
     logger.info(f"SMS queued: {message.id}, task: {task.id}")
+    invalidate("stats:v1")
     
     return jsonify({
         "status": "accepted",
@@ -154,10 +198,7 @@ def send_sms():
 @require_api_key
 def get_message(message_id):
     """Get status of a specific message"""
-    # Import here to avoid circular import
-    from api.app import db
-    
-    message = Message.query.get(message_id)
+    message = db.session.get(Message, message_id)
     if not message:
         return jsonify({"error": "Message not found"}), 404
     
@@ -166,16 +207,20 @@ def get_message(message_id):
 
 @api_v1.route('/sms/bulk', methods=['POST'])
 @handle_exceptions
+@shared_limit("5/minute")
 @require_api_key
 def send_bulk_sms():
     """Process a bulk SMS job from CSV data"""
-    # Import here to avoid circular import
-    from api.app import db, limiter, logger
-    from api.tasks import process_csv_upload
-    
-    # Apply rate limiter
-    limiter.limit("5/minute")(lambda: None)()
-    
+    # Reject oversized uploads from the declared length before any
+    # bytes are spooled; MAX_CONTENT_LENGTH still backstops clients
+    # that lie about (or omit) Content-Length mid-stream
+    max_bytes = current_app.config['MAX_CONTENT_LENGTH']
+    if request.content_length and request.content_length > max_bytes:
+        return jsonify({
+            "error": "Payload too large",
+            "message": f"CSV uploads are limited to {max_bytes} bytes"
+        }), 413
+
     # Check if a file was uploaded
     if 'file' not in request.files:
         return jsonify({"error": "No file provided"}), 400
@@ -187,11 +232,29 @@ def send_bulk_sms():
     
     if not file.filename.endswith('.csv'):
         return jsonify({"error": "File must be a CSV"}), 400
-    
-    # Read the file content instead of saving to a temporary file
-    # This way we can pass the content directly to the Celery task
-    csv_content = file.read().decode('utf-8')
-    
+
+    # Validate the sanitized name before touching the disk; an empty or
+    # mangled secure_filename result means a hostile original name
+    safe_name = secure_filename(file.filename)
+    if not CSV_NAME_RE.fullmatch(safe_name):
+        return jsonify({"error": "Invalid CSV filename"}), 400
+
+    # Stream the upload to disk in 1 MiB chunks, counting rows as we
+    # go, instead of reading the whole file into memory
+    temp_dir = tempfile.mkdtemp(dir=UPLOAD_DIR)
+    temp_path = os.path.join(temp_dir, safe_name)
+    newline_count = 0
+    with open(temp_path, 'wb') as out:
+        for chunk in iter(lambda: file.stream.read(1 << 20), b''):
+            out.write(chunk)
+            newline_count += chunk.count(b'\n')
+
+    # The header consumes one line; a trailing newline is optional.
+    # Newlines inside quoted fields are counted too, so this is an
+    # upper bound on the row count - the worker treats it as a hint and
+    # relies on its own (capped) parse for the actual limit check
+    expected_rows = max(newline_count - 1, 0)
+
     # Get parameters
     sim_id = request.form.get('sim_id', 3, type=int)
     delay = request.form.get('delay', 1.0, type=float)
@@ -202,15 +265,17 @@ def send_bulk_sms():
     if delay > 10.0:
         return jsonify({"error": "Delay cannot exceed 10 seconds"}), 400
     
-    # Queue the processing task with the CSV content directly
-    task = process_csv_upload.delay(
-        csv_content,
-        secure_filename(file.filename),
+    # Queue the processing task with the spooled file path
+    task = tasks.process_csv_upload.delay(
+        temp_path,
+        safe_name,
         sim_id,
-        delay
+        delay,
+        expected_rows
     )
     
     logger.info(f"Bulk SMS job queued: {file.filename}, task: {task.id}")
+    invalidate("stats:v1")
     
     return jsonify({
         "status": "accepted",
@@ -225,10 +290,7 @@ def send_bulk_sms():
 @require_api_key
 def get_bulk_job(job_id):
     """Get status of a specific bulk SMS job"""
-    # Import here to avoid circular import
-    from api.app import db
-    
-    job = BulkMessageJob.query.get(job_id)
+    job = db.session.get(BulkMessageJob, job_id)
     if not job:
         return jsonify({"error": "Job not found"}), 404
     
@@ -245,107 +307,204 @@ def get_bulk_job(job_id):
     return jsonify(result)
 
 
+def _encode_keyset_cursor(row):
+    raw = f"{row.created_at.isoformat()}:{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_keyset_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    ts, _, row_id = raw.rpartition(':')
+    return datetime.fromisoformat(ts), int(row_id)
+
+
 @api_v1.route('/bulk', methods=['GET'])
 @handle_exceptions
 @require_api_key
 def list_bulk_jobs():
-    """List all bulk SMS jobs"""
-    # Import here to avoid circular import
-    from api.app import db
-    
-    page = request.args.get('page', 1, type=int)
+    """List bulk SMS jobs with keyset pagination"""
     per_page = request.args.get('per_page', 10, type=int)
-    
-    # Limit page size
-    if per_page > 50:
+    cursor = request.args.get('cursor', None, type=str)
+
+    # Clamp page size; zero or negative would compile to a negative
+    # LIMIT, which Postgres rejects
+    if per_page < 1:
+        per_page = 1
+    elif per_page > 50:
         per_page = 50
-    
-    jobs = BulkMessageJob.query.order_by(BulkMessageJob.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+
+    # Keyset (seek) pagination: constant cost regardless of page depth,
+    # unlike OFFSET which scans and discards all preceding rows. The id
+    # tiebreaker keeps jobs sharing the boundary created_at from being
+    # skipped when paging, same as /messages/history
+    stmt = select(*BULK_JOB_COLS).order_by(
+        BulkMessageJob.created_at.desc(), BulkMessageJob.id.desc()
     )
-    
+    if cursor:
+        try:
+            cursor_ts, cursor_id = _decode_keyset_cursor(cursor)
+        except (ValueError, binascii.Error):
+            return jsonify({"error": "Invalid cursor"}), 400
+        stmt = stmt.where(
+            tuple_(BulkMessageJob.created_at, BulkMessageJob.id)
+            < (cursor_ts, cursor_id)
+        )
+
+    # Fetch one extra row to know whether another page exists
+    jobs = db.session.execute(stmt.limit(per_page + 1)).all()
+    next_cursor = None
+    if len(jobs) > per_page:
+        jobs = jobs[:per_page]
+        next_cursor = _encode_keyset_cursor(jobs[-1])
+
     return jsonify({
-        "total": jobs.total,
-        "pages": jobs.pages,
-        "current_page": jobs.page,
-        "per_page": jobs.per_page,
-        "jobs": [job.to_dict() for job in jobs.items]
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+        "jobs": [dict(job._mapping) for job in jobs]
     })
 
 
-@api_v1.route('/messages/history', methods=['GET'])
-@handle_exceptions
-@require_api_key
-def messages_history():
-    """Get message history with pagination and filtering"""
-    # Import here to avoid circular import
-    from api.app import db
-    from sqlalchemy import or_
-    
-    # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    
-    # Limit page size
-    if per_page > 100:
-        per_page = 100
-    
-    # Get filter parameters
+def _history_filters(stmt):
+    """Apply the shared status/date/phone filters to a history select"""
     status = request.args.get('status', 'all', type=str)
     date_range = request.args.get('date_range', 'all', type=str)
     phone_number = request.args.get('phone_number', '', type=str)
-    
-    # Build query with filters
-    query = Message.query
-    
-    # Filter by status
+
     if status != 'all':
-        query = query.filter_by(status=status)
-    
-    # Filter by date range
+        stmt = stmt.where(Message.status == status)
+
     now = datetime.utcnow()
     if date_range == 'today':
-        query = query.filter(Message.created_at >= now.replace(hour=0, minute=0, second=0, microsecond=0))
+        stmt = stmt.where(Message.created_at >= now.replace(hour=0, minute=0, second=0, microsecond=0))
     elif date_range == 'yesterday':
         yesterday = now - timedelta(days=1)
-        query = query.filter(
+        stmt = stmt.where(
             Message.created_at >= yesterday.replace(hour=0, minute=0, second=0, microsecond=0),
             Message.created_at < now.replace(hour=0, minute=0, second=0, microsecond=0)
         )
     elif date_range == 'week':
-        query = query.filter(Message.created_at >= now - timedelta(days=7))
+        stmt = stmt.where(Message.created_at >= now - timedelta(days=7))
     elif date_range == 'month':
-        query = query.filter(Message.created_at >= now - timedelta(days=30))
-    
-    # Filter by phone number (partial match)
+        stmt = stmt.where(Message.created_at >= now - timedelta(days=30))
+
     if phone_number:
-        query = query.filter(Message.phone_number.like(f'%{phone_number}%'))
-    
-    # Execute paginated query
-    paginated_messages = query.order_by(Message.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
-    
-    # Return paginated results
-    return jsonify({
-        "total": paginated_messages.total,
-        "pages": paginated_messages.pages,
-        "current_page": paginated_messages.page,
-        "per_page": paginated_messages.per_page,
-        "messages": [message.to_dict() for message in paginated_messages.items]
-    })
+        stmt = stmt.where(Message.phone_number.like(f'%{phone_number}%'))
+
+    return stmt
+
+
+def _history_total():
+    """
+    Total row count for the history view. With filters active this is an
+    exact COUNT; unfiltered it uses the planner's reltuples estimate
+    (cached for 60 s), which is free compared to a COUNT(*) scan.
+    """
+    filtered = (request.args.get('status', 'all') != 'all'
+                or request.args.get('date_range', 'all') != 'all'
+                or request.args.get('phone_number', ''))
+    if filtered:
+        stmt = _history_filters(select(func.count()).select_from(Message))
+        return db.session.execute(stmt).scalar()
+
+    try:
+        estimate = redis_client.get('messages:total:est')
+        if estimate is not None:
+            return int(estimate)
+    except redis.RedisError:
+        pass
+
+    total = db.session.execute(text(
+        "SELECT reltuples::bigint FROM pg_class WHERE relname = 'messages'"
+    )).scalar()
+    # reltuples is -1 until the table has been analyzed
+    total = max(int(total or 0), 0)
+    try:
+        redis_client.set('messages:total:est', total, ex=60)
+    except redis.RedisError:
+        pass
+    return total
+
+
+@api_v1.route('/messages/history', methods=['GET'])
+@handle_exceptions
+@require_api_key
+def messages_history():
+    """Get message history with pagination and filtering"""
+    # Get pagination parameters
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor', None, type=str)
+
+    # Clamp to sane bounds: page 0 or negative values would compile to
+    # a negative OFFSET/LIMIT, which Postgres rejects outright
+    if page < 1:
+        page = 1
+    if per_page < 1:
+        per_page = 1
+    elif per_page > 100:
+        per_page = 100
+
+    # Keyset path: a (created_at, id) cursor keeps the cost of deep
+    # pages constant - OFFSET scans and discards page*per_page rows
+    if cursor:
+        try:
+            cursor_ts, cursor_id = _decode_keyset_cursor(cursor)
+        except (ValueError, binascii.Error):
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        stmt = _history_filters(select(*MESSAGE_COLS)).where(
+            tuple_(Message.created_at, Message.id) < (cursor_ts, cursor_id)
+        ).order_by(
+            Message.created_at.desc(), Message.id.desc()
+        ).limit(per_page + 1)
+
+        rows = db.session.execute(stmt).all()
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = _encode_keyset_cursor(rows[-1])
+
+        return jsonify({
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "messages": [dict(row._mapping) for row in rows]
+        })
+
+    # Legacy page/OFFSET path, kept while the dashboard still drives
+    # numbered page navigation. Fetching one extra row replaces the
+    # COUNT(*) that .paginate() ran on every request - often slower than
+    # the page fetch itself under LIKE '%...%' filters
+    stmt = _history_filters(select(*MESSAGE_COLS)).order_by(
+        Message.created_at.desc()
+    ).limit(per_page + 1).offset((page - 1) * per_page)
+
+    rows = db.session.execute(stmt).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    payload = {
+        "current_page": page,
+        "per_page": per_page,
+        "has_next": has_next,
+        "messages": [dict(row._mapping) for row in rows]
+    }
+
+    # Totals are opt-in: only the paginated dashboard view needs them
+    if request.args.get('include_total') == '1':
+        total = _history_total()
+        payload["total"] = total
+        payload["pages"] = math.ceil(total / per_page) if total else 0
+
+    return jsonify(payload)
 
 
 # Statistics endpoints
 @api_v1.route('/stats', methods=['GET'])
 @handle_exceptions
 @require_api_key
+@cached(key="stats:v1", ttl=5, vary=('time_range',))
 def get_stats():
     """Get SMS statistics"""
-    # Import here to avoid circular import
-    from api.app import db
-    from sqlalchemy import func
-    
     # Get time range parameter
     time_range = request.args.get('time_range', 'all', type=str)
     
@@ -362,130 +521,121 @@ def get_stats():
     elif time_range == 'year':
         time_filter = now - timedelta(days=365)
     
-    # Base queries
-    message_query = Message.query
-    job_query = BulkMessageJob.query
-    
-    # Apply time filter if specified
+    # Count messages by status in a single GROUP BY round trip
+    message_rows = db.session.query(Message.status, func.count())
     if time_filter:
-        message_query = message_query.filter(Message.created_at >= time_filter)
-        job_query = job_query.filter(BulkMessageJob.created_at >= time_filter)
-    
-    # Count messages by status
+        message_rows = message_rows.filter(Message.created_at >= time_filter)
+    message_counts = dict(message_rows.group_by(Message.status).all())
+
     messages = {
-        "total": message_query.count(),
-        "sent": message_query.filter_by(status="sent").count(),
-        "failed": message_query.filter_by(status="failed").count(),
-        "pending": message_query.filter_by(status="pending").count(),
-        "processing": message_query.filter_by(status="processing").count()
+        "total": sum(message_counts.values()),
+        "sent": message_counts.get("sent", 0),
+        "failed": message_counts.get("failed", 0),
+        "pending": message_counts.get("pending", 0),
+        "processing": message_counts.get("processing", 0)
     }
-    
-    # Count bulk jobs by status
+
+    # Count bulk jobs by status the same way
+    job_rows = db.session.query(BulkMessageJob.status, func.count())
+    if time_filter:
+        job_rows = job_rows.filter(BulkMessageJob.created_at >= time_filter)
+    job_counts = dict(job_rows.group_by(BulkMessageJob.status).all())
+
     jobs = {
-        "total": job_query.count(),
-        "completed": job_query.filter_by(status="completed").count(),
-        "failed": job_query.filter_by(status="failed").count(),
-        "pending": job_query.filter_by(status="pending").count(),
-        "processing": job_query.filter_by(status="processing").count()
+        "total": sum(job_counts.values()),
+        "completed": job_counts.get("completed", 0),
+        "failed": job_counts.get("failed", 0),
+        "pending": job_counts.get("pending", 0),
+        "processing": job_counts.get("processing", 0)
     }
     
     # Device status
-    device = DeviceStatus.query.order_by(DeviceStatus.last_check.desc()).first()
+    device = db.session.execute(
+        select(DeviceStatus).order_by(DeviceStatus.last_check.desc()).limit(1)
+    ).scalar_one_or_none()
     device_status = device.to_dict() if device else {"connected": False, "state": None}
     
-    # Get time-series data for charts
+    # Get time-series data for charts. One grouped query fetches every
+    # bucket at once instead of two COUNTs per bucket
     timeData = {
         "labels": [],
         "messages": [],
         "successRate": []
     }
-    
-    # Generate time labels and data based on time range
-    if time_range == 'day':
-        # Hourly data for the last 24 hours
-        for i in range(23, -1, -1):
-            start_time = now - timedelta(hours=i)
-            end_time = now - timedelta(hours=i-1) if i > 0 else now
-            
-            # Add hour label
-            timeData["labels"].append(start_time.strftime('%H:00'))
-            
-            # Count messages in this hour
-            hour_messages = message_query.filter(
-                Message.created_at >= start_time,
-                Message.created_at < end_time
-            )
-            
-            total = hour_messages.count()
-            successful = hour_messages.filter_by(status="sent").count()
-            
-            timeData["messages"].append(total)
-            timeData["successRate"].append(round((successful / total * 100) if total > 0 else 0))
-            
-    elif time_range == 'week':
-        # Daily data for the last 7 days
-        for i in range(6, -1, -1):
-            day = now - timedelta(days=i)
-            day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-            day_end = day_start + timedelta(days=1)
-            
-            # Add day label
-            timeData["labels"].append(day.strftime('%a'))
-            
-            # Count messages on this day
-            day_messages = message_query.filter(
-                Message.created_at >= day_start,
-                Message.created_at < day_end
-            )
-            
-            total = day_messages.count()
-            successful = day_messages.filter_by(status="sent").count()
-            
-            timeData["messages"].append(total)
-            timeData["successRate"].append(round((successful / total * 100) if total > 0 else 0))
-            
-    elif time_range == 'month':
-        # Weekly data for the last 30 days
-        for i in range(4, 0, -1):
-            week_start = now - timedelta(days=i*7)
-            week_end = now - timedelta(days=(i-1)*7) if i > 1 else now
-            
-            # Add week label
-            timeData["labels"].append(f"Week {5-i}")
-            
-            # Count messages in this week
-            week_messages = message_query.filter(
-                Message.created_at >= week_start,
-                Message.created_at < week_end
-            )
-            
-            total = week_messages.count()
-            successful = week_messages.filter_by(status="sent").count()
-            
-            timeData["messages"].append(total)
-            timeData["successRate"].append(round((successful / total * 100) if total > 0 else 0))
-            
-    elif time_range == 'year' or time_range == 'all':
-        # Monthly data for the last 12 months
-        for i in range(11, -1, -1):
-            month_start = (now - timedelta(days=30*i)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            month_end = (month_start.replace(month=month_start.month+1) if month_start.month < 12 
-                        else month_start.replace(year=month_start.year+1, month=1))
-            
-            # Add month label
-            timeData["labels"].append(month_start.strftime('%b'))
-            
-            # Count messages in this month
-            month_messages = message_query.filter(
-                Message.created_at >= month_start,
-                Message.created_at < month_end
-            )
-            
-            total = month_messages.count()
-            successful = month_messages.filter_by(status="sent").count()
-            
+
+    granularity = {
+        'day': 'hour',
+        'week': 'day',
+        'month': 'day',
+        'year': 'month',
+        'all': 'month',
+    }.get(time_range)
+
+    if granularity:
+        if time_range == 'day':
+            series_start = (now - timedelta(hours=23)).replace(
+                minute=0, second=0, microsecond=0)
+        elif time_range == 'week':
+            series_start = (now - timedelta(days=6)).replace(
+                hour=0, minute=0, second=0, microsecond=0)
+        elif time_range == 'month':
+            series_start = (now - timedelta(days=28)).replace(
+                hour=0, minute=0, second=0, microsecond=0)
+        else:
+            series_start = (now - timedelta(days=334)).replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0)
+
+        bucket = func.date_trunc(granularity, Message.created_at)
+        rows = db.session.query(
+            bucket.label('bucket'), Message.status, func.count()
+        ).filter(
+            Message.created_at >= series_start
+        ).group_by('bucket', Message.status).all()
+
+        totals = {}
+        sent_counts = {}
+        for bucket_start, status, count in rows:
+            totals[bucket_start] = totals.get(bucket_start, 0) + count
+            if status == 'sent':
+                sent_counts[bucket_start] = sent_counts.get(bucket_start, 0) + count
+
+        def add_point(label, keys):
+            total = sum(totals.get(k, 0) for k in keys)
+            successful = sum(sent_counts.get(k, 0) for k in keys)
+            timeData["labels"].append(label)
             timeData["messages"].append(total)
-            timeData["successRate"].append(round((successful / total * 100) if total > 0 else 0))
+            timeData["successRate"].append(
+                round((successful / total * 100) if total > 0 else 0))
+
+        if time_range == 'day':
+            # Hourly data for the last 24 hours
+            for i in range(23, -1, -1):
+                hour = (now - timedelta(hours=i)).replace(
+                    minute=0, second=0, microsecond=0)
+                add_point(hour.strftime('%H:00'), [hour])
+        elif time_range == 'week':
+            # Daily data for the last 7 days
+            for i in range(6, -1, -1):
+                day = (now - timedelta(days=i)).replace(
+                    hour=0, minute=0, second=0, microsecond=0)
+                add_point(day.strftime('%a'), [day])
+        elif time_range == 'month':
+            # Weekly data for the last 4 weeks, built from day buckets
+            for i in range(4, 0, -1):
+                days = [
+                    (now - timedelta(days=d)).replace(
+                        hour=0, minute=0, second=0, microsecond=0)
+                    for d in range(i * 7 - 1, (i - 1) * 7 - 1, -1)
+                ]
+                add_point(f"Week {5-i}", days)
+        else:
+            # Monthly data for the last 12 calendar months
+            month = series_start
+            for _ in range(12):
+                add_point(month.strftime('%b'), [month])
+                month = (month.replace(month=month.month + 1)
+                         if month.month < 12
+                         else month.replace(year=month.year + 1, month=1))
     
     return jsonify({
         "messages": messages,
@@ -495,26 +645,11 @@ def get_stats():
     })
 
 
-# Health check endpoint - Open access (no auth required)
-@api_v1.route('/health', methods=['GET'])
-@handle_exceptions
-def health_check():
-    """API health check"""
-    return jsonify({
-        "status": "ok",
-        "timestamp": datetime.utcnow().isoformat(),
-        "version": "0.2.0"
-    })
-
-
 @api_v1.route('/messages', methods=['GET'])
 @handle_exceptions
 @require_api_key
 def list_messages():
     """List recent messages"""
-    # Import here to avoid circular import
-    from api.app import db
-    
     # Get query parameters
     limit = request.args.get('limit', 10, type=int)
     sort = request.args.get('sort', 'desc', type=str)
@@ -523,18 +658,18 @@ def list_messages():
     if limit > 100:
         limit = 100
     
-    # Build query with appropriate sorting
-    query = Message.query
+    # Columnar fetch: Row tuples skip ORM instance hydration on what is
+    # a pure read-and-serialize path
+    stmt = select(*MESSAGE_COLS)
     if sort.lower() == 'desc':
-        query = query.order_by(Message.created_at.desc())
+        stmt = stmt.order_by(Message.created_at.desc())
     else:
-        query = query.order_by(Message.created_at.asc())
-    
-    # Execute the query with limit
-    messages = query.limit(limit).all()
-    
+        stmt = stmt.order_by(Message.created_at.asc())
+
+    messages = db.session.execute(stmt.limit(limit)).all()
+
     return jsonify({
-        "messages": [message.to_dict() for message in messages],
+        "messages": [dict(message._mapping) for message in messages],
         "count": len(messages),
         "limit": limit
     })
@@ -542,8 +677,7 @@ def list_messages():
 
 # Define a function to register blueprints to avoid circular imports
 def register_blueprints(app):
-    # Register the v1 blueprint with a unique name for /api
-    app.register_blueprint(api_v1, url_prefix='/api')
-    
-    # For backward compatibility, also register at /api/v1 with a different name
-    app.register_blueprint(api_v1, url_prefix='/api/v1', name='api_v1_specific')
\ No newline at end of file
+    # Register the v1 blueprint once at /api/v1. Legacy /api/* paths are
+    # aliased to /api/v1/* by the WSGI middleware in api.app, so the
+    # url_map holds each rule only once
+    app.register_blueprint(api_v1, url_prefix='/api/v1')
\ No newline at end of file
@@ -7,7 +7,8 @@ This can be used as a quick test to verify your setup is working.
 from main import send_sms, check_adb_connection
 
 if __name__ == "__main__":
-    if check_adb_connection():
+    connected, _, _ = check_adb_connection()
+    if connected:
         # Test by sending a message to your own number
         send_sms(
             "+1234567890",  # Replace with a valid phone number
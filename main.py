@@ -6,152 +6,480 @@ This script can be used as a command-line tool or imported as a module.
 """
 
 import argparse
-import pandas as pd
+import concurrent.futures
+import functools
+import re
 import subprocess
 import shlex
+import threading
 import time
 import sys
 from typing import List, Optional, Dict, Union, Tuple
 
+# CLI exit codes
+EXIT_OK = 0
+EXIT_ERR = 1
+
+
+# Persistent adb shell session (one per process). Forking adb for every
+# message pays the USB/TCP transport handshake each time - typically
+# 100-300 ms of overhead per SMS. A long-lived shell amortizes that over
+# the life of the process. The session is opt-in via open_adb_shell()
+# (the Celery workers open one on process init); the CLI and anything
+# that never opens one keep using one-shot adb invocations.
+_adb_shell: Optional[subprocess.Popen] = None
+_adb_shell_lock = threading.Lock()
+_ADB_SENTINEL = "__ADBSMS_RC__"
+# Worst-case budget for a one-shot send; a hung adbd otherwise stalls a
+# bulk run forever
+_SEND_TIMEOUT = 10
+# Constant parts of the pooled-shell command are formatted once; only
+# the per-message fields are quoted (a shell *is* on the far side there)
+_ADB_SEND_TEMPLATE = (
+    "service call isms 5 i32 {sim_id}"
+    " s16 com.android.mms.service s16 null"
+    " s16 {phone} s16 null s16 {message}"
+    " s16 null s16 null i32 0 i64 0"
+    "; echo " + _ADB_SENTINEL + "$?\n"
+)
+
+
+# Set once the adb server is known to be up; the first adb command in a
+# cold process otherwise pays the ~500 ms `adb start-server` spawn
+# interleaved with whatever called it
+_adb_server_ready = False
+
+
+def _ensure_adb_server_started() -> None:
+    """Warm the adb server once per process."""
+    global _adb_server_ready
+    if _adb_server_ready:
+        return
+    try:
+        subprocess.run(
+            ["adb", "start-server"],
+            check=True,
+            timeout=5,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        _adb_server_ready = True
+    except Exception:
+        # Leave the flag unset - the caller's own adb command will
+        # surface the real error
+        pass
+
+
+@functools.lru_cache(maxsize=256)
+def _quoted(token: str) -> str:
+    """
+    Shell-quote one token, cached: bulk blasts typically repeat the
+    same message body across many recipients, so quoting work is O(M)
+    distinct strings instead of O(N) rows.
+    """
+    return shlex.quote(token)
+
+
+def open_adb_shell() -> bool:
+    """
+    Start (or restart) the persistent adb shell session.
+
+    Returns:
+        bool: True if a live session is available, False otherwise
+    """
+    global _adb_shell
+    with _adb_shell_lock:
+        if _adb_shell is not None and _adb_shell.poll() is None:
+            return True
+        _ensure_adb_server_started()
+        try:
+            _adb_shell = subprocess.Popen(
+                ["adb", "shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+            )
+            return True
+        except OSError as e:
+            print(f"Could not start persistent adb shell: {e}")
+            _adb_shell = None
+            return False
+
+
+def close_adb_shell() -> None:
+    """Terminate the persistent adb shell session, if one is open."""
+    global _adb_shell
+    with _adb_shell_lock:
+        if _adb_shell is not None:
+            try:
+                _adb_shell.terminate()
+                _adb_shell.wait(timeout=5)
+            except Exception:
+                _adb_shell.kill()
+            _adb_shell = None
+
+
+def _send_via_shell(phone_number: str, message: str, sim_id: int) -> Optional[bool]:
+    """
+    Send one message over the persistent shell session.
+
+    Returns True/False for a completed attempt, or None when no session
+    is open (or it died mid-command), in which case the caller falls
+    back to a one-shot adb invocation.
+    """
+    command = _ADB_SEND_TEMPLATE.format(
+        sim_id=sim_id,
+        phone=_quoted(phone_number),
+        message=_quoted(message),
+    )
+    global _adb_shell
+    with _adb_shell_lock:
+        shell = _adb_shell
+        if shell is None or shell.poll() is not None:
+            return None
+        # The sentinel read below blocks while holding the lock, so a
+        # hung adbd would otherwise wedge every future send in the
+        # process. A watchdog kills the session at the same deadline the
+        # one-shot path gets; the read then hits EOF and the dead
+        # session is discarded (the next open_adb_shell() starts a
+        # fresh one)
+        watchdog = threading.Timer(_SEND_TIMEOUT, shell.kill)
+        watchdog.start()
+        try:
+            shell.stdin.write(command)
+            # Read until the sentinel echoes back with the exit status
+            for line in shell.stdout:
+                line = line.strip()
+                if line.startswith(_ADB_SENTINEL):
+                    return line[len(_ADB_SENTINEL):] == "0"
+            # EOF: either the watchdog fired (a completed-but-failed
+            # attempt - do not retry the same message one-shot) or the
+            # shell died on its own (fall back)
+            _adb_shell = None
+            if not watchdog.is_alive():
+                print(f"  ❌ Failed: adb shell session timed out after {_SEND_TIMEOUT}s")
+                return False
+            return None
+        except (BrokenPipeError, OSError):
+            _adb_shell = None
+            return None
+        finally:
+            watchdog.cancel()
+
+
+@functools.lru_cache(maxsize=8)
+def make_sender(sim_id: int):
+    """
+    Partially evaluate send_sms for a fixed SIM.
+
+    The constant argv segments are built once per sim_id, so each send
+    only splices in the two per-message fields instead of rebuilding
+    the full 21-token list. Cached because a bulk job reuses the same
+    SIM for every message.
+
+    Args:
+        sim_id: SIM card subId to bake into the sender
+
+    Returns:
+        Callable[[str, str], bool]: send(phone_number, message)
+    """
+    # List form avoids the *local* shell, but adb joins its arguments
+    # with spaces and hands the string to the device-side /system/bin/sh,
+    # so the two caller-controlled fields must still be quoted - an
+    # unquoted message would be word-split (or worse, interpreted) on
+    # the device
+    prefix = (
+        "adb", "shell",
+        "service", "call", "isms", "5",
+        "i32", str(sim_id),              # SIM subId
+        "s16", "com.android.mms.service",  # calling package
+        "s16", "null",                   # default SMSC
+        "s16",                           # recipient follows
+    )
+    middle = (
+        "s16", "null",                   # no scAddr override
+        "s16",                           # message body follows
+    )
+    tail = (
+        "s16", "null",                   # no sentIntent
+        "s16", "null",                   # no deliveryIntent
+        "i32", "0",                      # flags (Android 11+)
+        "i64", "0",                      # timestamp (Android 11+)
+    )
+
+    def send(phone_number: str, message: str) -> bool:
+        print(f"Sending to {phone_number!r}: {message!r}")
+
+        # Prefer the pooled shell session when one has been opened
+        pooled = _send_via_shell(phone_number, message, sim_id)
+        if pooled is not None:
+            print("  ✅ Sent" if pooled else "  ❌ Failed (adb shell session)")
+            return pooled
+
+        try:
+            # Only the exit status matters - route the Parcel dump from
+            # `service call` to /dev/null instead of the console
+            subprocess.run(
+                [*prefix, _quoted(phone_number), *middle, _quoted(message),
+                 *tail],
+                check=True,
+                timeout=_SEND_TIMEOUT,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            print("  ✅ Sent")
+            return True
+        except subprocess.TimeoutExpired:
+            print(f"  ❌ Failed: send timed out after {_SEND_TIMEOUT}s")
+            return False
+        except subprocess.CalledProcessError as e:
+            print(f"  ❌ Failed: {e}")
+            return False
+
+    return send
+
 
 def send_sms(phone_number: str, message: str, sim_id: int = 3) -> bool:
     """
     Send a single SMS message using ADB.
-    
+
     Args:
         phone_number: The recipient's phone number
         message: The message to send
         sim_id: SIM card subId (default: 3 for eSIM)
-        
+
     Returns:
         bool: True if message was sent successfully, False otherwise
     """
-    # Build the token list, shell-escaping each piece
-    cmd_tokens = [
-        "adb", "shell",
-        "service", "call", "isms", "5",
-        "i32", str(sim_id),                            # SIM subId
-        "s16", shlex.quote("com.android.mms.service"), # calling package
-        "s16", shlex.quote("null"),                    # default SMSC
-        "s16", shlex.quote(phone_number),              # recipient
-        "s16", shlex.quote("null"),                    # no scAddr override
-        "s16", shlex.quote(message),                   # message body
-        "s16", shlex.quote("null"),                    # no sentIntent
-        "s16", shlex.quote("null"),                    # no deliveryIntent
-        "i32", "0",                                    # flags (Android 11+)
-        "i64", "0",                                    # timestamp (Android 11+)
-    ]
-
-    # Execute
-    print(f"Sending to {phone_number!r}: {message!r}")
-    try:
-        subprocess.run(cmd_tokens, check=True)
-        print("  ✅ Sent")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"  ❌ Failed: {e}")
-        return False
+    return make_sender(sim_id)(phone_number, message)
+
 
+# Permissive phone shape for CSV rows: optional +, 6-15 digits. Rows
+# failing this would only burn a guaranteed-failing adb call
+_BULK_PHONE_RE = r'\+?\d{6,15}'
 
-def send_bulk_sms(csv_path: str, sim_id: int = 3, delay: float = 1.0) -> Tuple[int, int]:
+
+def _valid_rows(chunk) -> Tuple["pd.DataFrame", int]:
+    """
+    Vectorized sanity filter for one CSV chunk.
+
+    Returns the rows worth sending and the number dropped, so invalid
+    rows are counted as failures without ever forking adb.
+    """
+    mask = (chunk['phone_number'].str.fullmatch(_BULK_PHONE_RE, na=False)
+            & chunk['message'].str.len().ge(1))
+    dropped = int((~mask).sum())
+    if dropped:
+        for phone in chunk.loc[~mask, 'phone_number'].fillna('?'):
+            print(f"  ⚠️ Skipping invalid row for {phone!r}")
+    return chunk[mask], dropped
+
+
+def send_bulk_sms(csv_path: str, sim_id: int = 3, delay: float = 1.0,
+                  workers: int = 1) -> Tuple[int, int]:
     """
     Send multiple SMS messages from a CSV file.
-    
+
     Args:
         csv_path: Path to the CSV file with phone_number and message columns
         sim_id: SIM card subId (default: 3 for eSIM)
         delay: Time to wait between messages in seconds
-        
+        workers: Number of parallel senders; only used when delay is 0
+            (a non-zero delay implies deliberate rate limiting)
+
     Returns:
         Tuple[int, int]: Count of (success, failure) messages
     """
+    # pandas pulls in numpy and friends (~300 ms); only the bulk path
+    # pays for it, keeping --single and --check-only startup light
+    import pandas as pd
+
+    # Bail out before parsing anything when no device is attached -
+    # otherwise every row eats a failing adb spawn
+    connected, _, _ = check_adb_connection()
+    if not connected:
+        print("No ADB device connected; aborting bulk send.")
+        return 0, 0
+
+    success_count = 0
+    failure_count = 0
+
+    # The pooled shell is one serialized pipe, so parallel dispatch
+    # skips it and overlaps one-shot invocations in adbd instead
+    parallel = workers > 1 and delay == 0
+
+    # Open the pooled adb shell once for the whole batch, so each send
+    # reuses one transport instead of forking adb per message. If the
+    # session cannot start, send_sms falls back to one-shot invocations
+    opened = False if parallel else open_adb_shell()
+    next_at = None
+
     try:
-        # Load the CSV, forcing phone_number and message to strings
-        df = pd.read_csv(
+        # Stream the CSV in fixed-size chunks, forcing phone_number and
+        # message to strings: peak memory stays O(chunksize) and the
+        # first message goes out before a large file finishes parsing
+        reader = pd.read_csv(
             csv_path,
-            dtype={
-                'phone_number': str,
-                'message': str
-            }
+            usecols=['phone_number', 'message'],
+            dtype={'phone_number': str, 'message': str},
+            chunksize=1000,
         )
+
+        if parallel:
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=workers) as executor:
+                for chunk in reader:
+                    chunk, dropped = _valid_rows(chunk)
+                    failure_count += dropped
+                    results = executor.map(
+                        lambda row: send_sms(str(row[0]), str(row[1]), sim_id),
+                        chunk.itertuples(index=False, name=None)
+                    )
+                    for result in results:
+                        if result:
+                            success_count += 1
+                        else:
+                            failure_count += 1
+            return success_count, failure_count
+
+        for chunk in reader:
+            chunk, dropped = _valid_rows(chunk)
+            failure_count += dropped
+
+            # itertuples yields plain tuples - no per-row Series boxing
+            # like iterrows
+            for phone_number, message in chunk.itertuples(index=False,
+                                                          name=None):
+                # Pace sends against a monotonic deadline, so the time
+                # a send itself takes counts toward the interval: the
+                # gap between message starts is max(delay, send_time)
+                # rather than delay + send_time
+                if next_at is not None:
+                    remaining = next_at - time.monotonic()
+                    if remaining > 0:
+                        time.sleep(remaining)
+                next_at = time.monotonic() + delay
+
+                # Ensure we have strings (in case of stray NaNs or numeric parsing)
+                phone_number = str(phone_number)
+                message = str(message)
+
+                result = send_sms(phone_number, message, sim_id)
+                if result:
+                    success_count += 1
+                else:
+                    failure_count += 1
     except Exception as e:
         print(f"Error reading CSV file: {e}")
-        return 0, 0
+        return success_count, failure_count
+    finally:
+        if opened:
+            close_adb_shell()
 
-    success_count = 0
-    failure_count = 0
+    return success_count, failure_count
 
-    # Iterate and send
-    for index, row in df.iterrows():
-        # Ensure we have strings (in case of stray NaNs or numeric parsing)
-        phone_number = str(row['phone_number'])
-        message = str(row['message'])
 
-        result = send_sms(phone_number, message, sim_id)
-        if result:
-            success_count += 1
-        else:
-            failure_count += 1
+# Precompiled matchers for `adb devices` output. The header line has no
+# tab, so a tab-anchored pattern can scan the whole buffer in one pass
+# instead of strip/split/contains per line. The state is matched as the
+# exact token "device" to the end of the line - substring checks would
+# false-match serials or states that merely contain it
+_READY_DEVICE_RE = re.compile(r'^(\S+)\tdevice\s*$', re.M)
+_ANY_DEVICE_RE = re.compile(r'^(\S+)\t(\S+)', re.M)
 
-        # Throttle to avoid flooding
-        if index < len(df) - 1:  # Don't sleep after the last message
-            time.sleep(delay)
 
-    return success_count, failure_count
+# TTL cache for check_adb_connection: devices do not come and go within
+# a few seconds, so pre-flight checks around repeated sends should not
+# each pay a ~200 ms adb fork
+_ADB_CHECK_TTL = 5.0
+_adb_check_lock = threading.Lock()
+_adb_check_state = {"ts": 0.0, "val": None}
+
+
+def check_adb_connection() -> Tuple[bool, Optional[str], Optional[str]]:
+    """
+    Check if ADB is working and a device is connected.
+
+    Results are cached for a few seconds; call
+    ``check_adb_connection.cache_clear()`` to force a fresh probe.
+
+    Returns:
+        Tuple[bool, Optional[str], Optional[str]]: (connected, device_id,
+        state) for the first attached device, so callers that need the
+        device details do not have to run `adb devices` a second time
+    """
+    with _adb_check_lock:
+        if (_adb_check_state["val"] is not None
+                and time.monotonic() - _adb_check_state["ts"] < _ADB_CHECK_TTL):
+            return _adb_check_state["val"]
+
+    val = _check_adb_connection_uncached()
 
+    with _adb_check_lock:
+        _adb_check_state["ts"] = time.monotonic()
+        _adb_check_state["val"] = val
+    return val
 
-def check_adb_connection() -> bool:
-    """Check if ADB is working and a device is connected."""
+
+def _clear_adb_check_cache() -> None:
+    with _adb_check_lock:
+        _adb_check_state["val"] = None
+
+
+check_adb_connection.cache_clear = _clear_adb_check_cache
+
+
+def _check_adb_connection_uncached() -> Tuple[bool, Optional[str], Optional[str]]:
+    _ensure_adb_server_started()
     try:
         result = subprocess.run(
-            ["adb", "devices"], 
-            capture_output=True, 
-            text=True, 
+            ["adb", "devices"],
+            capture_output=True,
+            text=True,
             check=True
         )
-        
-        # Check if any device is connected (more than just the "List of devices attached" line)
-        lines = result.stdout.strip().split('\n')
-        if len(lines) <= 1:
+
+        # Hot path: one regex pass over the whole buffer for a device in
+        # "device" state (not offline or unauthorized)
+        ready = _READY_DEVICE_RE.search(result.stdout)
+        if ready:
+            print(f"Connected device found: {ready.group(0)}")
+            return True, ready.group(1), "device"
+
+        # Cold paths: nothing attached at all, or only devices in a
+        # non-ready state - report the first one for diagnostics
+        attached = _ANY_DEVICE_RE.search(result.stdout)
+        if attached is None:
             print("No devices connected. Please connect an Android device.")
-            return False
-            
-        # Check that at least one device is in "device" state (not offline or unauthorized)
-        device_found = False
-        for line in lines[1:]:  # Skip the header line
-            if line.strip() and "\tdevice" in line:
-                device_found = True
-                print(f"Connected device found: {line.strip()}")
-                break
-                
-        if not device_found:
-            print("Device found but not authorized or offline. Check your device.")
-            # Print the actual devices output to help diagnose
-            for line in lines:
-                print(f"  > {line}")
-            return False
-            
-        return True
+            return False, None, None
+
+        print("Device found but not authorized or offline. Check your device.")
+        # Print the actual devices output to help diagnose
+        for line in result.stdout.strip().split('\n'):
+            print(f"  > {line}")
+        return False, attached.group(1), attached.group(2)
     except subprocess.CalledProcessError as e:
         print(f"ADB command error: {e}")
         print(f"Error output: {e.stderr}")
-        return False
+        return False, None, None
     except FileNotFoundError:
         print("ADB not found or not working properly. Make sure ADB is installed and in your PATH.")
-        return False
+        return False, None, None
     except Exception as e:
         print(f"Error checking ADB connection: {e}")
         import traceback
         print(traceback.format_exc())
-        return False
+        return False, None, None
 
 
-def parse_arguments():
-    """Parse command line arguments."""
+def _build_parser() -> argparse.ArgumentParser:
+    """Construct the CLI argument parser."""
     parser = argparse.ArgumentParser(
         description="Send SMS messages using ADB to a connected Android device."
     )
-    
+
     # Add arguments
     parser.add_argument(
         "-f", "--file", 
@@ -171,7 +499,13 @@ def parse_arguments():
         help="Delay between messages in seconds (default: 1.0)"
     )
     parser.add_argument(
-        "--single", 
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="Parallel senders for bulk mode; only used when --delay is 0 (default: 1)"
+    )
+    parser.add_argument(
+        "--single",
         action="store_true",
         help="Send a single message instead of reading from CSV"
     )
@@ -188,8 +522,18 @@ def parse_arguments():
         action="store_true",
         help="Only check ADB connection and exit"
     )
-    
-    return parser.parse_args()
+
+    return parser
+
+
+# Built once at import - repeated main() calls (scripted or test usage)
+# skip the add_argument setup cost
+_PARSER = _build_parser()
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    return _PARSER.parse_args()
 
 
 def main():
@@ -200,28 +544,30 @@ def main():
         int: Exit code (0 for success, 1 for failure)
     """
     args = parse_arguments()
-    
+
     # Check ADB connection first
-    if not check_adb_connection():
-        return 1
-        
+    connected, _, _ = check_adb_connection()
+    if not connected:
+        return EXIT_ERR
+
     if args.check_only:
         print("✅ ADB connection successful")
-        return 0
-    
+        return EXIT_OK
+
     if args.single:
         if not args.number or not args.message:
             print("Error: --number and --message are required with --single")
-            return 1
-        
+            return EXIT_ERR
+
         success = send_sms(args.number, args.message, args.sim_id)
-        return 0 if success else 1
+        return EXIT_OK if success else EXIT_ERR
     else:
         # Bulk mode
         print(f"Sending messages from {args.file} with SIM ID {args.sim_id} and {args.delay}s delay")
-        success, failure = send_bulk_sms(args.file, args.sim_id, args.delay)
+        success, failure = send_bulk_sms(args.file, args.sim_id, args.delay,
+                                         args.workers)
         print(f"Completed: {success} succeeded, {failure} failed")
-        return 1 if failure > 0 else 0
+        return EXIT_ERR if failure > 0 else EXIT_OK
 
 
 if __name__ == "__main__":
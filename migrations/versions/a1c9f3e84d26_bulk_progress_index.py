@@ -0,0 +1,25 @@
+"""Add composite index for bulk-job progress aggregation
+
+Revision ID: a1c9f3e84d26
+Revises: f4b8a1e62d05
+Create Date: 2026-08-26 12:07:42.118355
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c9f3e84d26'
+down_revision = 'f4b8a1e62d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_msg_sim_created_status', 'messages',
+                    ['sim_id', 'created_at', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_msg_sim_created_status', table_name='messages')
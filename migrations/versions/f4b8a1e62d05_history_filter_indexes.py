@@ -0,0 +1,30 @@
+"""Add composite and trigram indexes for message history filters
+
+Revision ID: f4b8a1e62d05
+Revises: e7a2d5c90f13
+Create Date: 2026-08-26 11:52:17.634908
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8a1e62d05'
+down_revision = 'e7a2d5c90f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_msg_created_status', 'messages',
+                    ['created_at', 'status'], unique=False)
+    op.create_index('ix_msg_phone_trgm', 'messages', ['phone_number'],
+                    unique=False, postgresql_using='gin',
+                    postgresql_ops={'phone_number': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_msg_phone_trgm', table_name='messages')
+    op.drop_index('ix_msg_created_status', table_name='messages')
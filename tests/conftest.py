@@ -9,6 +9,25 @@ from unittest.mock import MagicMock
 # Add the parent directory to the path so we can import the main module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+@pytest.fixture(autouse=True)
+def clear_adb_check_cache():
+    """Reset the check_adb_connection TTL cache between tests"""
+    import main
+    main.check_adb_connection.cache_clear()
+    yield
+    main.check_adb_connection.cache_clear()
+
+@pytest.fixture(autouse=True)
+def no_adb_shell(monkeypatch):
+    """Keep tests from ever spawning a real persistent adb shell"""
+    import main
+    monkeypatch.setattr(
+        "subprocess.Popen", MagicMock(side_effect=OSError("adb disabled in tests"))
+    )
+    # Pretend the adb server is already warm, so the one-time
+    # start-server spawn never leaks into per-test call counts
+    monkeypatch.setattr(main, "_adb_server_ready", True)
+
 @pytest.fixture
 def mock_subprocess_run(monkeypatch):
     """Mock for subprocess.run to avoid actual ADB calls during testing"""
@@ -17,6 +36,20 @@ def mock_subprocess_run(monkeypatch):
     monkeypatch.setattr("subprocess.run", mock_run)
     return mock_run
 
+@pytest.fixture
+def adb_devices_stdout(request, monkeypatch):
+    """Stub subprocess.run to return the given `adb devices` output.
+
+    Parametrize indirectly with the stdout string for the scenario.
+    """
+    import subprocess
+    stdout = request.param
+    monkeypatch.setattr(
+        "subprocess.run",
+        lambda *a, **k: subprocess.CompletedProcess(a[0], 0, stdout=stdout)
+    )
+    return stdout
+
 @pytest.fixture
 def mock_time_sleep(monkeypatch):
     """Mock for time.sleep to avoid delays during testing"""
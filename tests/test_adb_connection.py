@@ -6,76 +6,34 @@ import subprocess
 from main import check_adb_connection
 
 
-def test_adb_connection_success(monkeypatch):
-    """Test successful ADB connection check with device connected"""
-    # Mock subprocess.run to simulate a successful ADB connection
-    def mock_run(*args, **kwargs):
-        mock_result = subprocess.CompletedProcess(
-            args=args[0],
-            returncode=0,
-            stdout="List of devices attached\nABCD1234\tdevice\n"
-        )
-        return mock_result
-    
-    monkeypatch.setattr("subprocess.run", mock_run)
-    
-    # Check result
-    result = check_adb_connection()
-    assert result is True
-
-
-def test_adb_connection_no_devices(monkeypatch):
-    """Test ADB connection check with no devices connected"""
-    # Mock subprocess.run to simulate no devices connected
-    def mock_run(*args, **kwargs):
-        mock_result = subprocess.CompletedProcess(
-            args=args[0],
-            returncode=0,
-            stdout="List of devices attached\n"
-        )
-        return mock_result
-    
-    monkeypatch.setattr("subprocess.run", mock_run)
-    
-    # Check result
-    result = check_adb_connection()
-    assert result is False
-
-
-def test_adb_connection_unauthorized_device(monkeypatch):
-    """Test ADB connection check with unauthorized device"""
-    # Mock subprocess.run to simulate unauthorized device
-    def mock_run(*args, **kwargs):
-        mock_result = subprocess.CompletedProcess(
-            args=args[0],
-            returncode=0,
-            stdout="List of devices attached\nABCD1234\tunauthorized\n"
-        )
-        return mock_result
-    
-    monkeypatch.setattr("subprocess.run", mock_run)
-    
-    # Check result
-    result = check_adb_connection()
-    assert result is False
-
-
-def test_adb_connection_offline_device(monkeypatch):
-    """Test ADB connection check with offline device"""
-    # Mock subprocess.run to simulate offline device
-    def mock_run(*args, **kwargs):
-        mock_result = subprocess.CompletedProcess(
-            args=args[0],
-            returncode=0,
-            stdout="List of devices attached\nABCD1234\toffline\n"
-        )
-        return mock_result
-    
-    monkeypatch.setattr("subprocess.run", mock_run)
-    
-    # Check result
-    result = check_adb_connection()
-    assert result is False
+@pytest.mark.parametrize(
+    "adb_devices_stdout, expected",
+    [
+        # Device connected and ready
+        ("List of devices attached\nABCD1234\tdevice\n",
+         (True, "ABCD1234", "device")),
+        # No devices connected
+        ("List of devices attached\n",
+         (False, None, None)),
+        # Unauthorized device
+        ("List of devices attached\nABCD1234\tunauthorized\n",
+         (False, "ABCD1234", "unauthorized")),
+        # Offline device
+        ("List of devices attached\nABCD1234\toffline\n",
+         (False, "ABCD1234", "offline")),
+        # A serial or state merely containing 'device' must not count as
+        # ready - regression guard for substring matching
+        ("List of devices attached\n"
+         "mydevice1234\tunauthorized\n"
+         "ABCD1234\tdevice:bogus\n",
+         (False, "mydevice1234", "unauthorized")),
+    ],
+    ids=["ready", "no-devices", "unauthorized", "offline", "exact-state"],
+    indirect=["adb_devices_stdout"],
+)
+def test_adb_connection_parsing(adb_devices_stdout, expected):
+    """Test connection-state parsing across adb devices outputs"""
+    assert check_adb_connection() == expected
 
 
 def test_adb_connection_adb_not_found(monkeypatch):
@@ -83,12 +41,12 @@ def test_adb_connection_adb_not_found(monkeypatch):
     # Mock subprocess.run to simulate ADB not found
     def mock_run(*args, **kwargs):
         raise FileNotFoundError("ADB not found")
-    
+
     monkeypatch.setattr("subprocess.run", mock_run)
-    
+
     # Check result
-    result = check_adb_connection()
-    assert result is False
+    connected, _, _ = check_adb_connection()
+    assert connected is False
 
 
 def test_adb_connection_adb_error(monkeypatch):
@@ -96,9 +54,9 @@ def test_adb_connection_adb_error(monkeypatch):
     # Mock subprocess.run to simulate ADB error
     def mock_run(*args, **kwargs):
         raise subprocess.CalledProcessError(1, "adb devices", "Error output")
-    
+
     monkeypatch.setattr("subprocess.run", mock_run)
-    
+
     # Check result
-    result = check_adb_connection()
-    assert result is False
\ No newline at end of file
+    connected, _, _ = check_adb_connection()
+    assert connected is False
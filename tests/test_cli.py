@@ -14,7 +14,7 @@ def test_cli_check_only(monkeypatch):
     monkeypatch.setattr(sys, "argv", test_args)
     
     # Mock check_adb_connection to return True
-    monkeypatch.setattr(main, "check_adb_connection", lambda: True)
+    monkeypatch.setattr(main, "check_adb_connection", lambda: (True, "ABCD1234", "device"))
     
     # Capture stdout to check output
     with patch("sys.stdout") as mock_stdout:
@@ -34,7 +34,7 @@ def test_cli_single_sms(monkeypatch):
     monkeypatch.setattr(sys, "argv", test_args)
     
     # Mock check_adb_connection and send_sms
-    monkeypatch.setattr(main, "check_adb_connection", lambda: True)
+    monkeypatch.setattr(main, "check_adb_connection", lambda: (True, "ABCD1234", "device"))
     monkeypatch.setattr(main, "send_sms", lambda phone, msg, sim_id: True)
     
     # Call main() and check the return code
@@ -49,7 +49,7 @@ def test_cli_single_sms_missing_args(monkeypatch):
     monkeypatch.setattr(sys, "argv", test_args)
     
     # Mock check_adb_connection
-    monkeypatch.setattr(main, "check_adb_connection", lambda: True)
+    monkeypatch.setattr(main, "check_adb_connection", lambda: (True, "ABCD1234", "device"))
     
     # Call main() and check the return code
     exit_code = main.main()
@@ -63,8 +63,8 @@ def test_cli_bulk_sms(monkeypatch):
     monkeypatch.setattr(sys, "argv", test_args)
     
     # Mock check_adb_connection and send_bulk_sms
-    monkeypatch.setattr(main, "check_adb_connection", lambda: True)
-    monkeypatch.setattr(main, "send_bulk_sms", lambda file, sim_id, delay: (3, 0))  # 3 success, 0 failures
+    monkeypatch.setattr(main, "check_adb_connection", lambda: (True, "ABCD1234", "device"))
+    monkeypatch.setattr(main, "send_bulk_sms", lambda file, sim_id, delay, workers=1: (3, 0))  # 3 success, 0 failures
     
     # Call main() and check the return code
     exit_code = main.main()
@@ -78,8 +78,8 @@ def test_cli_bulk_sms_with_failures(monkeypatch):
     monkeypatch.setattr(sys, "argv", test_args)
     
     # Mock check_adb_connection and send_bulk_sms
-    monkeypatch.setattr(main, "check_adb_connection", lambda: True)
-    monkeypatch.setattr(main, "send_bulk_sms", lambda file, sim_id, delay: (2, 1))  # 2 success, 1 failure
+    monkeypatch.setattr(main, "check_adb_connection", lambda: (True, "ABCD1234", "device"))
+    monkeypatch.setattr(main, "send_bulk_sms", lambda file, sim_id, delay, workers=1: (2, 1))  # 2 success, 1 failure
     
     # Call main() and check the return code
     exit_code = main.main()
@@ -93,7 +93,7 @@ def test_cli_adb_connection_failure(monkeypatch):
     monkeypatch.setattr(sys, "argv", test_args)
     
     # Mock check_adb_connection to return False
-    monkeypatch.setattr(main, "check_adb_connection", lambda: False)
+    monkeypatch.setattr(main, "check_adb_connection", lambda: (False, None, None))
     
     # Call main() and check the return code
     exit_code = main.main()
@@ -4,14 +4,28 @@ Tests for the send_bulk_sms function in main.py
 import pytest
 from unittest.mock import patch, MagicMock
 import pandas as pd
+import main
 from main import send_bulk_sms
 
 
-def test_send_bulk_sms_success(sample_csv_path, mock_subprocess_run, mock_time_sleep):
+@pytest.fixture
+def mock_device_connected(monkeypatch):
+    """Pretend a ready device is attached, skipping the adb probe"""
+    monkeypatch.setattr(
+        main, "check_adb_connection", lambda: (True, "ABCD1234", "device")
+    )
+
+
+def test_send_bulk_sms_success(sample_csv_path, mock_subprocess_run,
+                               mock_time_sleep, mock_device_connected,
+                               monkeypatch):
     """Test successful bulk SMS sending"""
     # Configure mock to simulate success
     mock_subprocess_run.return_value.returncode = 0
-    
+
+    # Freeze the monotonic clock so the paced sleep equals the delay
+    monkeypatch.setattr("time.monotonic", lambda: 100.0)
+
     # Call the function
     success, failure = send_bulk_sms(sample_csv_path, 3, 0.5)
     
@@ -23,7 +37,27 @@ def test_send_bulk_sms_success(sample_csv_path, mock_subprocess_run, mock_time_s
     mock_time_sleep.assert_called_with(0.5)  # Check delay value
 
 
-def test_send_bulk_sms_mixed_results(sample_csv_path, monkeypatch, mock_time_sleep):
+def test_send_bulk_sms_pooled_shell(sample_csv_path, mock_subprocess_run,
+                                    mock_time_sleep, monkeypatch,
+                                    mock_device_connected):
+    """Test that an open adb shell session is reused for every send"""
+    # Fake session: alive, and echoes a success sentinel per message
+    fake_shell = MagicMock()
+    fake_shell.poll.return_value = None
+    fake_shell.stdout = iter(["__ADBSMS_RC__0\n", "__ADBSMS_RC__0\n"])
+    monkeypatch.setattr(main, "_adb_shell", fake_shell)
+
+    success, failure = send_bulk_sms(sample_csv_path, 3, 0.5)
+
+    # Both messages went over the session - no one-shot adb forks
+    assert success == 2
+    assert failure == 0
+    mock_subprocess_run.assert_not_called()
+    assert fake_shell.stdin.write.call_count == 2
+
+
+def test_send_bulk_sms_mixed_results(sample_csv_path, monkeypatch,
+                                 mock_time_sleep, mock_device_connected):
     """Test bulk SMS sending with mixed results"""
     # Create a mock send_sms function that alternates between success and failure
     calls = []
@@ -46,7 +80,8 @@ def test_send_bulk_sms_mixed_results(sample_csv_path, monkeypatch, mock_time_sle
     assert calls[0][2] == 3  # Check SIM ID was passed correctly
 
 
-def test_send_bulk_sms_file_error(monkeypatch, mock_time_sleep):
+def test_send_bulk_sms_file_error(monkeypatch, mock_time_sleep,
+                              mock_device_connected):
     """Test bulk SMS sending with a file error"""
     # Mock pd.read_csv to raise an exception
     def mock_read_csv(*args, **kwargs):
@@ -60,4 +95,60 @@ def test_send_bulk_sms_file_error(monkeypatch, mock_time_sleep):
     # Verify results
     assert success == 0
     assert failure == 0
-    assert mock_time_sleep.call_count == 0  # No sleeps should happen
\ No newline at end of file
+    assert mock_time_sleep.call_count == 0  # No sleeps should happen
+
+def test_send_bulk_sms_invalid_rows(tmp_path, monkeypatch, mock_time_sleep,
+                                    mock_device_connected):
+    """Test that invalid rows fail without triggering a send"""
+    csv_content = ("phone_number,message\n"
+                   "not-a-number,Hello\n"        # non-numeric phone
+                   "+1234567890,\n"              # empty message
+                   "+9876543210,Still valid\n")
+    file_path = tmp_path / "mixed_validity.csv"
+    file_path.write_text(csv_content)
+
+    calls = []
+
+    def mock_send_sms(phone, message, sim_id):
+        calls.append(phone)
+        return True
+
+    monkeypatch.setattr("main.send_sms", mock_send_sms)
+
+    success, failure = send_bulk_sms(str(file_path), 3, 0.5)
+
+    assert success == 1
+    assert failure == 2  # Both invalid rows counted, neither sent
+    assert calls == ["+9876543210"]
+
+
+def test_send_bulk_sms_parallel(sample_csv_path, monkeypatch, mock_time_sleep,
+                                mock_device_connected):
+    """Test parallel dispatch when delay is zero"""
+    calls = []
+
+    def mock_send_sms(phone, message, sim_id):
+        calls.append((phone, message, sim_id))
+        return True
+
+    monkeypatch.setattr("main.send_sms", mock_send_sms)
+
+    success, failure = send_bulk_sms(sample_csv_path, 3, 0, workers=2)
+
+    assert success == 2
+    assert failure == 0
+    assert len(calls) == 2
+    assert mock_time_sleep.call_count == 0  # No throttling in parallel mode
+
+
+def test_send_bulk_sms_no_device(monkeypatch, mock_time_sleep):
+    """Test that a missing device short-circuits before any send"""
+    monkeypatch.setattr(main, "check_adb_connection", lambda: (False, None, None))
+    mock_run = MagicMock()
+    monkeypatch.setattr("subprocess.run", mock_run)
+
+    success, failure = send_bulk_sms("messages.csv", 3, 0.5)
+
+    assert success == 0
+    assert failure == 0
+    mock_run.assert_not_called()  # No adb spawn per row
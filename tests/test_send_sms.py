@@ -2,8 +2,9 @@
 Tests for the send_sms function in main.py
 """
 import pytest
-from unittest.mock import call
+from unittest.mock import call, MagicMock
 import subprocess
+import main
 from main import send_sms
 
 
@@ -40,6 +41,41 @@ def test_send_sms_failure(mock_subprocess_run):
     mock_subprocess_run.assert_called_once()
 
 
+def test_send_sms_timeout(mock_subprocess_run):
+    """Test that a hung adb invocation is treated as a failure"""
+    # Configure mock to simulate a stalled adbd
+    mock_subprocess_run.side_effect = subprocess.TimeoutExpired("adb", 10)
+
+    # Call the function
+    result = send_sms("+1234567890", "Test message", 3)
+
+    # Verify results
+    assert result is False
+    mock_subprocess_run.assert_called_once()
+
+
+def test_send_sms_shell_session_timeout(mock_subprocess_run, monkeypatch):
+    """Test that a hung pooled-shell command fails without wedging"""
+    # Session that never echoes the sentinel: the watchdog kills it and
+    # the read loop sees EOF
+    fake_shell = MagicMock()
+    fake_shell.poll.return_value = None
+    fake_shell.stdout = iter([])
+    monkeypatch.setattr(main, "_adb_shell", fake_shell)
+
+    fired_watchdog = MagicMock()
+    fired_watchdog.is_alive.return_value = False
+    monkeypatch.setattr(main.threading, "Timer", lambda *a, **k: fired_watchdog)
+
+    result = send_sms("+1234567890", "Test message", 3)
+
+    # A timed-out attempt is a failure, not a fallback retry, and the
+    # dead session is discarded
+    assert result is False
+    mock_subprocess_run.assert_not_called()
+    assert main._adb_shell is None
+
+
 def test_send_sms_different_sim_id(mock_subprocess_run):
     """Test SMS sending with different SIM ID"""
     # Configure mock to simulate success
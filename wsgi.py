@@ -0,0 +1,20 @@
+"""
+WSGI entrypoint for AdbSms
+
+Applies gevent monkey-patching before any other imports so that stdlib
+sockets (and psycopg2 via psycogreen) cooperate with the gevent event
+loop. Run with:
+
+    gunicorn -k gevent --workers=$(nproc) --worker-connections=2000 \
+        --max-requests=500 --max-requests-jitter=200 wsgi:app
+"""
+from gevent import monkey
+monkey.patch_all()
+
+from psycogreen.gevent import patch_psycopg
+patch_psycopg()
+
+from api.app import app  # noqa: E402
+
+if __name__ == '__main__':
+    app.run()